@@ -1,11 +1,13 @@
-from sqlalchemy import Column, String, DateTime, Boolean, create_engine, ForeignKey, Float
+from sqlalchemy import Column, String, DateTime, Boolean, ForeignKey, Float, Index
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.orm import relationship
+import logging
 import os
 from datetime import datetime
 import json
-from sqlalchemy import inspect
-from sqlalchemy.sql import text
+
+logger = logging.getLogger('researchinc')
 
 Base = declarative_base()
 
@@ -15,15 +17,23 @@ class Project(Base):
     project_id = Column(String, primary_key=True)
     created_at = Column(DateTime, default=datetime.now, nullable=True)
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now, nullable=True)
-    message_history = relationship("ProjectMessage", back_populates="project", cascade="all, delete-orphan")
+    # lazy="raise" so accidental lazy loads fail loudly; readers must eager
+    # load via selectinload (see ProjectRepository.get)
+    message_history = relationship("ProjectMessage", back_populates="project", cascade="all, delete-orphan", lazy="raise")
     system_prompt = Column(String, nullable=True)
     plan = Column(String, nullable=True)
     findings = Column(String, nullable=True)
     final_answer = Column(String, nullable=True)
+    # Messages evicted from the in-memory history window, JSONL-encoded;
+    # only the hot window stays resident (see ProjectManager)
+    archived_history = Column(String, nullable=True)
 
 class ProjectMessage(Base):
     __tablename__ = 'project_messages'
-    
+    # History reads filter by project and order by time; without this index
+    # they scan the whole table
+    __table_args__ = (Index("ix_pm_project_created", "project_id", "created_at"),)
+
     event_id = Column(String, primary_key=True)
     project_id = Column(String, ForeignKey('projects.project_id'), nullable=False)
     role = Column(String, nullable=False)
@@ -32,69 +42,45 @@ class ProjectMessage(Base):
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now, nullable=True)
     project = relationship("Project", back_populates="message_history")
 
-# Global database session
-_db_session = None
+# Global engine and session factory: connections come from the engine's pool,
+# and each unit of work gets its own short-lived AsyncSession from the factory.
 _engine = None
+_session_factory = None
 
-def get_db_session(drop_all=False):
-    global _db_session, _engine
-    
-    # If drop_all is True and session exists, close it and reset
-    if drop_all and _db_session is not None:
-        _db_session.close()
-        _db_session = None
-        _engine = None
-    
-    # If session already exists, return it
-    if _db_session is not None:
-        return _db_session
-    
-    # Create new session if it doesn't exist
-    database_url = os.environ.get("DATABASE_URL")
-    print(f"database_url: {database_url}")
-    if not database_url:
-        raise ValueError("DATABASE_URL environment variable is not set")
-    
-    _engine = create_engine(database_url)
-    
-    if drop_all:
-        print("Dropping all tables...")
-        # Check if tables exist before dropping
-        inspector = inspect(_engine)
-        existing_tables = inspector.get_table_names()
-        print(f"Tables before dropping: {existing_tables}")
-        
-        # Drop all tables with CASCADE to handle foreign key dependencies
-        for table in existing_tables:
-            print(f"Dropping table with CASCADE: {table}")
-            with _engine.connect() as conn:
-                conn.execute(text(f"DROP TABLE IF EXISTS {table} CASCADE"))
-                conn.commit()
-        
-        # Verify tables were dropped
-        inspector = inspect(_engine)
-        remaining_tables = inspector.get_table_names()
-        print(f"Tables after dropping: {remaining_tables}")
-        
-        if remaining_tables:
-            print("WARNING: Some tables were not dropped!")
-            # Force drop each table individually
-            for table in remaining_tables:
-                print(f"Force dropping table: {table}")
-                with _engine.connect() as conn:
-                    conn.execute(text(f"DROP TABLE IF EXISTS {table} CASCADE"))
-                    conn.commit()
-        
-        print("All tables dropped successfully.")
-    
-    # Create all tables
-    Base.metadata.create_all(_engine)
-    
-    # Verify tables were created
-    inspector = inspect(_engine)
-    created_tables = inspector.get_table_names()
-    print(f"Tables after creation: {created_tables}")
-    
-    Session = sessionmaker(bind=_engine)
-    _db_session = Session()
-    return _db_session 
\ No newline at end of file
+
+def get_engine():
+    global _engine
+
+    if _engine is None:
+        database_url = os.environ.get("DATABASE_URL")
+        if not database_url:
+            raise ValueError("DATABASE_URL environment variable is not set")
+        _engine = create_async_engine(
+            database_url,
+            pool_size=20,
+            max_overflow=30,
+            pool_pre_ping=True,
+            pool_recycle=3600,
+            pool_timeout=30,
+        )
+    return _engine
+
+
+def get_session_factory():
+    global _session_factory
+
+    if _session_factory is None:
+        _session_factory = async_sessionmaker(
+            get_engine(), class_=AsyncSession, expire_on_commit=False
+        )
+    return _session_factory
+
+
+async def init_db(drop_all=False):
+    """Creates the schema (optionally dropping it first). Call once at startup."""
+    engine = get_engine()
+    async with engine.begin() as conn:
+        if drop_all:
+            logger.debug("Dropping all tables...")
+            await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all) 
\ No newline at end of file
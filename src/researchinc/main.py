@@ -1,13 +1,20 @@
 from typing import Union, List
 import uvicorn
-import threading
-import time
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from researchinc.presentation.websocket.rest.websocket_controller import websocket_router
+from researchinc.domain.models import get_session_factory, init_db
 
 app = FastAPI()
 
+
+@app.on_event("startup")
+async def startup():
+    # Build the engine/session factory and create the schema once here, so
+    # request paths only ever hit warm accessors
+    await init_db()
+    get_session_factory()
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
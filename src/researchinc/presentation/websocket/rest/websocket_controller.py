@@ -1,6 +1,11 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 from typing import Dict, List, AsyncGenerator
 import json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - fall back to stdlib json
+    orjson = None
 import asyncio
 import random
 import re
@@ -18,17 +23,101 @@ async def websocket_endpoint(websocket: WebSocket):
     """
     await websocket.accept()
 
+    # Outbound events go through a bounded queue drained by a single pump
+    # task: the agent only pays for a put per event, and the pump coalesces
+    # everything queued into one newline-delimited frame. The bound keeps a
+    # slow client from growing the queue without limit.
+    outbound: asyncio.Queue = asyncio.Queue(maxsize=256)
+
     async def send_message(message):
-        await websocket.send_text(json.dumps(message))
+        if pump_failed.is_set():
+            # The pump died (client likely disconnected); fail fast so the
+            # agent run aborts instead of filling a queue nobody drains
+            raise RuntimeError("outbound pump failed; client disconnected?")
+        if orjson is not None:
+            payload = orjson.dumps(message)
+        else:
+            payload = json.dumps(message).encode()
+        # Entries carry their droppability so backpressure can never shed a
+        # control event by accident
+        if message.get("type") == "message":
+            # Streamed text chunks are droppable under backpressure. Queued
+            # entries can't be discarded selectively without reordering any
+            # control events behind them, so shed the newest chunk instead.
+            try:
+                outbound.put_nowait((True, payload))
+            except asyncio.QueueFull:
+                pass
+        else:
+            # Control events (plan/findings/error/done) must never be
+            # dropped; block until the pump frees a slot
+            await outbound.put((False, payload))
+
+    async def pump_outbound():
+        while True:
+            batch = [(await outbound.get())[1]]
+            # Linger briefly (15 ms, capped at 64 events) so adjacent
+            # streaming chunks share one frame instead of one frame each
+            try:
+                while len(batch) < 64:
+                    _, payload = await asyncio.wait_for(
+                        outbound.get(), timeout=0.015
+                    )
+                    batch.append(payload)
+            except asyncio.TimeoutError:
+                pass
+            await websocket.send_bytes(b"\n".join(batch))
+
+    async def drain(ws: WebSocket, max_n: int = 16) -> List[str]:
+        """Returns the next frame plus any others already pending, up to max_n.
+
+        Blocks only for the first frame; the rest are collected with a tiny
+        timeout so a bursty client costs one loop wakeup instead of one per
+        message.
+        """
+        batch = [await ws.receive_text()]
+        try:
+            while len(batch) < max_n:
+                batch.append(
+                    await asyncio.wait_for(ws.receive_text(), timeout=0.001)
+                )
+        except asyncio.TimeoutError:
+            pass
+        return batch
+
+    pump_failed = asyncio.Event()
+
+    def on_pump_done(task: asyncio.Task):
+        if task.cancelled():
+            return
+        exc = task.exception()
+        if exc is not None:
+            logger.error(f"Outbound pump failed: {exc}")
+            pump_failed.set()
+            # Discard undelivered payloads so producers blocked on a full
+            # queue wake up and hit the fail-fast check
+            while not outbound.empty():
+                outbound.get_nowait()
 
+    pump_task = asyncio.create_task(pump_outbound())
+    pump_task.add_done_callback(on_pump_done)
     agent = AgentService(callback=send_message)
 
     try:
         while True:
-            data = await websocket.receive_text()
-            logger.info(f"Received message: {data}")
-            json_data = json.loads(data)
-            if json_data.get("type",None) == "request":
-                await agent.start_agent_loop(command=json_data)
+            frames = await drain(websocket)
+            commands = []
+            for data in frames:
+                # Full-message logging at INFO is a hidden cost on busy sockets
+                logger.debug(f"Received message: {data}")
+                json_data = orjson.loads(data) if orjson is not None else json.loads(data)
+                if json_data.get("type",None) == "request":
+                    commands.append(json_data)
+            # One shared AgentService per connection: initialize() swaps out
+            # all per-run state, so batched commands must run one at a time
+            for command in commands:
+                await agent.handle_command(command)
     except Exception as e:
         logger.error(f"Error: {e}")
+    finally:
+        pump_task.cancel()
@@ -1,60 +1,167 @@
-from researchinc.domain.models import Project, get_db_session
-from sqlalchemy.orm import Session
+from researchinc.domain.models import Project, ProjectMessage, get_session_factory
+from sqlalchemy import insert, select, update
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import selectinload
+import time
 import uuid
+
+# In-memory TTL cache for project lookups: the agent loop fetches the same
+# project_id many times per run, so skip the DB round trip for rows seen
+# recently. Entries are evicted on put/delete and expire after the TTL.
+_PROJECT_CACHE = {}
+_PROJECT_CACHE_MAX = 1024
+_PROJECT_CACHE_TTL = 60.0
+
+
+def _cache_get(project_id):
+    entry = _PROJECT_CACHE.get(project_id)
+    if entry is None:
+        return None
+    expires_at, project = entry
+    if expires_at < time.monotonic():
+        _PROJECT_CACHE.pop(project_id, None)
+        return None
+    return project
+
+
+def _cache_put(project_id, project):
+    if len(_PROJECT_CACHE) >= _PROJECT_CACHE_MAX:
+        # Drop the oldest entry (insertion order) to stay bounded
+        _PROJECT_CACHE.pop(next(iter(_PROJECT_CACHE)), None)
+    _PROJECT_CACHE[project_id] = (time.monotonic() + _PROJECT_CACHE_TTL, project)
+
+
 class ProjectRepository:
-    def __init__(self):
-        self.session = get_db_session(drop_all=False)
-
-    def put(self, project):
-        try:            
-            # Add the project to the session
-            self.session.merge(project)
-            
-            # Commit the transaction
-            self.session.commit()
-        except SQLAlchemyError as e:
-            # Roll back the session in case of error
-            self.session.rollback()
-            raise e
-
-    def get(self, project_id):
-        return self.session.query(Project).filter_by(project_id=project_id).first()
-    
-    def get_or_create(self, project_id=None):
-        if not project_id:
-            project_id = str(uuid.uuid4())
-        project = self.get(project_id)
-        if not project:
-            project = Project(project_id=project_id)
-            self.put(project)
+    def __init__(self, session_factory=None):
+        # Each unit of work opens its own session from the factory, so
+        # concurrent WebSocket connections never share a Session object.
+        # A factory can be injected (e.g. for tests); by default the shared
+        # pooled factory is used.
+        self.session_factory = session_factory or get_session_factory()
+
+    async def put(self, project):
+        """Persists the project's scalar fields.
+
+        Deliberately not a merge of the instance: merge cascades the
+        message_history collection, and with delete-orphan a stale loaded
+        collection reconciles the DB back to its snapshot — deleting rows
+        inserted out-of-band by bulk_add_messages. An explicit UPDATE
+        touches only the scalar columns.
+        """
+        async with self.session_factory() as session:
+            try:
+                result = await session.execute(
+                    update(Project)
+                    .where(Project.project_id == project.project_id)
+                    .values(
+                        system_prompt=project.system_prompt,
+                        plan=project.plan,
+                        findings=project.findings,
+                        final_answer=project.final_answer,
+                        archived_history=project.archived_history,
+                    )
+                )
+                if result.rowcount == 0:
+                    # First save of a fresh (transient) project; its
+                    # collection was never loaded, so merge is safe here
+                    await session.merge(project)
+
+                # Commit the transaction
+                await session.commit()
+                _PROJECT_CACHE.pop(project.project_id, None)
+            except SQLAlchemyError as e:
+                # Roll back the session in case of error
+                await session.rollback()
+                raise e
+
+    async def get(self, project_id):
+        cached = _cache_get(project_id)
+        if cached is not None:
+            return cached
+        async with self.session_factory() as session:
+            result = await session.execute(
+                select(Project)
+                .options(selectinload(Project.message_history))
+                .filter_by(project_id=project_id)
+            )
+            project = result.scalar_one_or_none()
+            if project is not None:
+                _cache_put(project_id, project)
+            return project
+
+    async def create(self, project_id):
+        """Creates a project row for an explicitly supplied id."""
+        project = Project(project_id=project_id)
+        await self.put(project)
         return project
 
-    def delete(self, project_id):
-        try:
-            self.session.query(Project).filter_by(project_id=project_id).delete()
-            self.session.commit()
-        except SQLAlchemyError as e:
-            self.session.rollback()
-            raise e
+    async def create_new_project(self):
+        """Creates a project with a freshly generated id.
+
+        Auto-uuid lives only here, so a missing project_id can never
+        silently insert a new row on a lookup path.
+        """
+        return await self.create(str(uuid.uuid4()))
+
+    async def bulk_add_messages(self, messages):
+        """Inserts a batch of ProjectMessage rows in a single round trip."""
+        if not messages:
+            return
+        async with self.session_factory() as session:
+            try:
+                await session.execute(insert(ProjectMessage), messages)
+                await session.commit()
+            except SQLAlchemyError as e:
+                await session.rollback()
+                raise e
+
+    async def delete(self, project_id):
+        async with self.session_factory() as session:
+            try:
+                result = await session.execute(
+                    select(Project).filter_by(project_id=project_id)
+                )
+                project = result.scalar_one_or_none()
+                if project is not None:
+                    await session.delete(project)
+                await session.commit()
+                _PROJECT_CACHE.pop(project_id, None)
+            except SQLAlchemyError as e:
+                await session.rollback()
+                raise e
+
+    async def list(self):
+        async with self.session_factory() as session:
+            result = await session.execute(select(Project))
+            return list(result.scalars().all())
 
-    def list(self):
-        return self.session.query(Project).all()
 
 class FakeProjectRepository(ProjectRepository):
+    # Cap on stored projects so long-running test/dev processes don't
+    # accumulate Project objects forever; oldest entries are evicted first
+    MAX_PROJECTS = 10000
+
     def __init__(self):
         self.projects = {}
         self._initialized = True  # No need to connect to a database for fake repository
-        
-    def put(self, project):
+
+    async def put(self, project):
+        if (
+            project.project_id not in self.projects
+            and len(self.projects) >= self.MAX_PROJECTS
+        ):
+            self.projects.pop(next(iter(self.projects)), None)
         self.projects[project.project_id] = project
-        
-    def get(self, project_id):
+
+    async def bulk_add_messages(self, messages):
+        self.messages = getattr(self, "messages", []) + list(messages)
+
+    async def get(self, project_id):
         return self.projects.get(project_id)
-        
-    def delete(self, project_id):
+
+    async def delete(self, project_id):
         if project_id in self.projects:
             del self.projects[project_id]
-            
-    def list(self):
-        return list(self.projects.values()) 
\ No newline at end of file
+
+    async def list(self):
+        return list(self.projects.values())
@@ -1,3 +1,5 @@
+import asyncio
+import functools
 import importlib
 import json
 import sys
@@ -17,22 +19,146 @@ logger = setup_logging()
 
 MODEL_ID = os.getenv("MODEL_ID", "claude-3-7-sonnet-latest")
 
+# Interned event type tags: these travel with every event on the output
+# path, so reuse single string objects instead of allocating fresh ones.
+_T_INFO = sys.intern("info")
+_T_MESSAGE = sys.intern("message")
+_T_ERROR = sys.intern("error")
+_T_PLAN = sys.intern("plan")
+_T_WARNING = sys.intern("warning")
+_T_FINDINGS = sys.intern("findings")
+_T_TOOL_CALL = sys.intern("tool_call")
+_T_TOOL_RESULT = sys.intern("tool_result")
+_T_CODE_EXECUTION = sys.intern("code_execution")
+
+def _block_to_dict(block) -> Dict[str, Any]:
+    """Converts an Anthropic SDK content block to a plain dict.
+
+    Plain dicts serialize faster than Pydantic models on every subsequent
+    request and don't pin SDK objects in the history for the whole run.
+    """
+    if block.type == "text":
+        return {"type": "text", "text": block.text}
+    if block.type == "tool_use":
+        return {
+            "type": "tool_use",
+            "id": block.id,
+            "name": block.name,
+            "input": block.input,
+        }
+    # Unknown block types (e.g. thinking): fall back to the SDK's own dump
+    return block.model_dump()
+
+
+@functools.lru_cache(maxsize=None)
+def _cached_import(name: str):
+    """Imports a module once per process; later connections hit the cache.
+
+    First import of a heavy package (e.g. pandas) can cost hundreds of ms;
+    this makes that a one-time cost instead of a per-connection one.
+    """
+    return importlib.import_module(name)
+
+
+# Names the system prompt authorizes for generated code. Resolved lazily by
+# _LazyImportGlobals, so sessions that never touch pandas don't pay its import.
+DEFAULT_AUTHORIZED_IMPORTS = ["datetime", "timedelta", "pandas"]
+
+# Authorized names that are module attributes rather than modules
+_ATTR_IMPORTS = {"timedelta": "datetime"}
+
+
+class _LazyImportGlobals(dict):
+    """Execution globals that import authorized modules on first use.
+
+    Heavy modules (e.g. pandas) are only imported when executed code first
+    touches them, instead of eagerly during agent construction. CodeExecutor
+    runs snippets with this dict as the single exec namespace, where both
+    top-level (LOAD_NAME) and in-function (LOAD_GLOBAL) lookups consult
+    __missing__ on dict subclasses, so executed code resolves these names
+    transparently.
+    """
+
+    def __init__(self, pending_imports):
+        super().__init__()
+        self._pending_imports = set(pending_imports)
+
+    def __missing__(self, name):
+        if name in self._pending_imports:
+            if name in _ATTR_IMPORTS:
+                value = getattr(_cached_import(_ATTR_IMPORTS[name]), name)
+            else:
+                value = _cached_import(name)
+            self[name] = value
+            self._pending_imports.discard(name)
+            logger.info(f"Lazily imported '{name}' for code execution.")
+            return value
+        raise KeyError(name)
+
+
+class _ChunkBatcher:
+    """Coalesces streamed LLM text chunks before they are emitted.
+
+    Token-level streaming produces one event per delta; batching them on a
+    small byte/time budget collapses dozens of emissions into one without
+    hurting perceived streaming latency.
+    """
+
+    def __init__(self, project_manager, max_bytes: int = 512, max_delay: float = 0.016):
+        self.project_manager = project_manager
+        self.max_bytes = max_bytes
+        self.max_delay = max_delay
+        self._parts: List[str] = []
+        self._size = 0
+        self._first_at = None
+
+    def add(self, text: str) -> bool:
+        """Buffers a chunk; returns True when the batch should be flushed."""
+        if self._first_at is None:
+            self._first_at = time.monotonic()
+        self._parts.append(text)
+        self._size += len(text)
+        return (
+            self._size >= self.max_bytes
+            or time.monotonic() - self._first_at >= self.max_delay
+        )
+
+    async def flush(self):
+        if not self._parts:
+            return
+        content = "".join(self._parts)
+        self._parts = []
+        self._size = 0
+        self._first_at = None
+        # Route the merged chunk to the client as a droppable "message"
+        # event; log() only writes to the console and never reaches the
+        # websocket
+        self.project_manager.emit_message(content)
+
+
 class AgentService:
     def __init__(self, callback: Callable[[Dict[str, Any]], None] = None):
         self.task = None
-        self.authorized_imports = []
+        self.authorized_imports = list(DEFAULT_AUTHORIZED_IMPORTS)
         self.callback = callback
+        # Dispatch table for response content blocks; unknown types fall back
+        # to _handle_unknown_block
+        self._block_handlers = {
+            "text": self._handle_text_block,
+            "tool_use": self._handle_tool_use_block,
+        }
 
     async def initialize(self,task:str, project_id:str):
-        self.project_manager = ProjectManager(initial_task=task, system_prompt="Initializing...", 
+        self.project_manager = ProjectManager(initial_task=task, system_prompt="Initializing...",
             project_id=project_id, callback=self.callback)
+        await self.project_manager.load_project()
         await self.project_manager.log(message="Initializing Agent")
 
         # Initialize components
         try:
             self.llm = LLM(model_id=MODEL_ID)
         except ValueError as e:
-            await self.project_manager.log(message=f"Failed to initialize LLM: {e}", type="error", status="error")
+            await self.project_manager.log(message=f"Failed to initialize LLM: {e}", type=_T_ERROR, status="error")
             return
         
         self.project_manager.add_message("user", task)
@@ -47,8 +173,10 @@ class AgentService:
             allowed_imports=self.authorized_imports,
         )
 
-        # Generate the real system prompt
+        # Generate the real system prompt. The tool set never changes after
+        # initialization, so keep the definitions around for the run loop.
         tool_definitions = self.tool_manager.get_tool_definitions()
+        self._tool_definitions = tool_definitions
         system_prompt = get_system_prompt(tool_definitions, self.authorized_imports)
         self.project_manager.system_prompt = system_prompt  # Update state
 
@@ -57,22 +185,18 @@ class AgentService:
         self.project_manager.set_initial_globals(initial_globals)  # Set in state
         self.code_executor.globals_locals = initial_globals  # Update executor directly
 
-        await self.project_manager.log(message="Agent initialized successfully.", type="info", status="ready")
-        await self.project_manager.log(message=self.project_manager.get_plan(), type="plan", status="ready")
+        await self.project_manager.log(message="Agent initialized successfully.", type=_T_INFO, status="ready")
+        await self.project_manager.log(message=self.project_manager.get_plan(), type=_T_PLAN, status="ready")
 
     def _prepare_initial_globals(self) -> Dict[str, Any]:
         """Prepares the initial global scope for the CodeExecutor."""
-        initial_globals = {}
-        # Import allowed modules
-        for import_name in self.authorized_imports:
-            try:
-                module = importlib.import_module(import_name)
-                initial_globals[import_name] = module
-                logger.info(f"Made module '{import_name}' available to code execution.")
-            except ImportError:
-                logger.warning(
-                    f"Could not import module '{import_name}' for code execution."
-                )
+        # Authorized imports are resolved lazily on first access by executed
+        # code, so tasks that never call execute_python pay no import cost
+        initial_globals = _LazyImportGlobals(self.authorized_imports)
+        if self.authorized_imports:
+            logger.info(
+                f"Deferred imports for code execution: {self.authorized_imports}"
+            )
 
         # Add callable *custom* tools
         callable_tools = self.tool_manager.get_callable_tools_for_eval()
@@ -83,16 +207,110 @@ class AgentService:
 
         return initial_globals
 
+    def _compact_content_blocks(self, content) -> List[Dict[str, Any]]:
+        """Collapses adjacent text blocks and converts SDK blocks to plain dicts.
+
+        The full text was already streamed out chunk by chunk, so storing one
+        merged text block keeps the history (re-sent to Anthropic every turn)
+        as small as possible.
+        """
+        compact_blocks: List[Dict[str, Any]] = []
+        text_buf: List[str] = []
+        for block in content:
+            if block.type == "text":
+                text_buf.append(block.text)
+            else:
+                if text_buf:
+                    compact_blocks.append({"type": "text", "text": "".join(text_buf)})
+                    text_buf = []
+                compact_blocks.append(_block_to_dict(block))
+        if text_buf:
+            compact_blocks.append({"type": "text", "text": "".join(text_buf)})
+        return compact_blocks
+
+    async def _handle_text_block(self, block, llm_call_id) -> bool:
+        """Text blocks were already streamed chunk by chunk; nothing to do."""
+        return False
+
+    async def _handle_unknown_block(self, block, llm_call_id) -> bool:
+        logger.debug(f"Ignoring unhandled content block type: {block.type}")
+        return False
+
+    async def _handle_tool_use_block(self, block, llm_call_id) -> bool:
+        """Executes a tool_use block and records its result in the history."""
+        result = await self._execute_tool_block(block)
+        await self._record_tool_result(block, result, llm_call_id)
+        return True
+
+    async def _execute_tool_block(self, block) -> Any:
+        """Logs and executes one tool_use block, returning its raw result."""
+        tool_name = block.name
+        tool_input = block.input
+
+        await self.project_manager.log(message=f"Executing tool: {tool_name} with args: {tool_input}", type=_T_TOOL_CALL, status="inprogress")
+        if tool_name == "execute_python":
+            await self.project_manager.log(message=tool_input.get("code", ""), type=_T_CODE_EXECUTION, status="inprogress")
+
+        # Execute the tool
+        return await self.tool_manager.execute_tool(tool_name, tool_input)
+
+    async def _record_tool_result(self, block, result, llm_call_id):
+        """Emits a tool result event and appends it to the history."""
+        tool_name = block.name
+        tool_use_id = block.id  # Keep the tool_use_id from Anthropic
+
+        # Determine if result indicates an error
+        is_error = False
+        result_content_for_llm = result
+        # Only lowercase the 6-char prefix: tool outputs can be
+        # huge and a full .lower() copies the whole string
+        if isinstance(result, str) and result[:6].lower() == "error:":
+            is_error = True
+        # Check dict format from execute_python_impl
+        if isinstance(result, dict) and result.get("error"):
+            is_error = True
+            result_content_for_llm = f"Error during execution: {result['error']}"  # Pass error string to LLM
+
+        # Format tool result as JSON, including LLM call ID
+        result_output = {
+            "id": llm_call_id,  # Add ID
+            "type": _T_TOOL_RESULT,
+            "tool": tool_name,
+            "success": not is_error,
+        }
+
+        # Format the result content based on its type
+        if isinstance(result, dict):
+            if "stdout" in result:
+                result_output["stdout"] = result.get("stdout")
+            if "error" in result:
+                result_output["error"] = result.get("error")
+        else:
+            result_output["content"] = str(result)
+
+        await self.project_manager.log(message=result_output, type=_T_TOOL_RESULT, status="complete")
+
+        # Add tool result message to state for the *next* LLM call
+        # Use the original tool_use_id provided by Anthropic
+        self.project_manager.add_tool_result(
+            tool_use_id=tool_use_id,
+            result=result_content_for_llm,  # Send stringified/error detail to LLM
+            is_error=is_error,
+        )
+
     async def handle_command(self, event: Dict[str, Any]):
         try:
             if event.get("type") == "request":
               await self.start_agent_loop(event)
         except Exception as e:
-            await self.project_manager.log(message="Error received from agent: " + str(e), type="error")
+            await self.project_manager.log(message="Error received from agent: " + str(e), type=_T_ERROR)
     
     async def start_agent_loop(self, command: Dict[str, Any]):
         task = command.get("content",None)
-        project_id = command.get("project_id",None)
+        # Creation is an explicit decision at the edge: use the client's
+        # project_id when supplied, otherwise mint one here rather than
+        # letting a lookup deep in the repository silently insert a row
+        project_id = command.get("project_id") or str(uuid.uuid4())
         await self.initialize(task, project_id)
         await self.run()
 
@@ -100,14 +318,17 @@ class AgentService:
         await self.project_manager.log(message="Agent starting run loop...")
         iterations = 0
 
+        # System prompt and tool definitions are fixed after initialize();
+        # hoist them out of the loop instead of rebuilding them per turn.
+        system_prompt = self.project_manager.get_system_prompt()
+        tool_definitions = self._tool_definitions
+
         while not self.project_manager.check_done() and iterations < max_iterations:
             iterations += 1
             await self.project_manager.log(message="Iteration start: " + str(iterations))
 
             # 1. Get state for LLM
             messages = self.project_manager.get_history()
-            system_prompt = self.project_manager.get_system_prompt()
-            tool_definitions = self.tool_manager.get_tool_definitions()
 
             # 2. Call LLM (Streaming)
             await self.project_manager.log(message="Calling LLM")
@@ -117,116 +338,101 @@ class AgentService:
                 messages, system_prompt, tool_definitions
             )
 
-            # Consume the stream and output chunks
-            try:
-                while True:
-                    chunk = next(stream_generator)
-                    await self.project_manager.log(message=chunk["content"], type=chunk["type"])
-
-                    if chunk["type"] == "error":
-                        await self.project_manager.log_error(message=chunk["content"])
-                    # Keep track of the ID from the first chunk
-                    if llm_call_id is None and "id" in chunk:
+            # Consume the stream and output chunks. Text chunks are coalesced
+            # by the batcher; any other event flushes it first so ordering is
+            # preserved.
+            chunk_batcher = _ChunkBatcher(self.project_manager)
+            async for chunk in stream_generator:
+                if chunk["type"] == "__final__":
+                    # Terminal chunk carries the call ID and the complete message
+                    if llm_call_id is None:
                         llm_call_id = chunk["id"]
+                    final_message = chunk["message"]
+                    break
 
-            except StopIteration as e:
-                # The generator is exhausted, capture the return value
-                # The return value is a tuple (llm_call_id, final_message_object)
-                if e.value:
-                    llm_call_id_from_return, final_message = e.value
-                    # Ensure we have the ID, either from chunks or return value
-                    if llm_call_id is None:
-                        llm_call_id = llm_call_id_from_return
+                if chunk["type"] == _T_MESSAGE:
+                    if chunk_batcher.add(chunk["content"]):
+                        await chunk_batcher.flush()
                 else:
-                    # Handle case where StopIteration has no value (e.g., an error occurred before yielding anything)
-                    # If llm_call_id wasn't set from an error chunk, generate one for consistency? Or rely on logger?
-                    # For now, assume an error chunk was yielded if e.value is None
-                    if llm_call_id is None:
-                        llm_call_id = "error-no-id"  # Fallback ID
-                    final_message = None  # Ensure final_message is None on stream error
+                    await chunk_batcher.flush()
+                    await self.project_manager.log(message=chunk["content"], type=chunk["type"])
+
+                if chunk["type"] == _T_ERROR:
+                    await self.project_manager.log_error(message=chunk["content"])
+                # Keep track of the ID from the first chunk
+                if llm_call_id is None and "id" in chunk:
+                    llm_call_id = chunk["id"]
+
+            if llm_call_id is None:
+                # Stream ended without yielding anything (defensive)
+                llm_call_id = "error-no-id"  # Fallback ID
+
+            # Emit any text still sitting in the batcher before moving on
+            await chunk_batcher.flush()
 
             # Add LLM call ID to status message for clarity
-            await self.project_manager.log(message="LLM stream finished.", type="message", status="complete")
+            await self.project_manager.log(message="LLM stream finished.", type=_T_MESSAGE, status="complete")
 
             # Check if the stream failed or returned empty content
             if final_message is None or final_message.content is None:
-                await self.project_manager.log(message="LLM stream failed or returned empty content. Terminating.", type="error", status="error")
+                await self.project_manager.log(message="LLM stream failed or returned empty content. Terminating.", type=_T_ERROR, status="error")
                 break
 
-            # Add assistant's *complete* response message to history before processing
-            # Important: Use final_message here, which is the complete Anthropic message object
-            self.project_manager.add_assistant_message(final_message.content)
+            # Add assistant's *complete* response message to history before
+            # processing, compacted to plain dicts with adjacent text merged
+            self.project_manager.add_assistant_message(
+                self._compact_content_blocks(final_message.content)
+            )
 
-            # 3. Process LLM response blocks from the final message
+            # 3. Process LLM response blocks from the final message.
+            # Tool calls within one turn are independent, so execute them
+            # concurrently; results are recorded in original block order to
+            # keep the history deterministic.
             executed_tool_this_turn = False
+            tool_blocks = []
             for block in final_message.content:
                 if block.type == "tool_use":
-                    tool_name = block.name
-                    tool_input = block.input
-                    tool_use_id = block.id  # Keep the tool_use_id from Anthropic
-                    executed_tool_this_turn = True
-
-                    await self.project_manager.log(message=f"Executing tool: {tool_name} with args: {tool_input}", type="tool_call", status="inprogress")
-                    if tool_name == "execute_python":
-                        await self.project_manager.log(message=tool_input.get("code", ""), type="code_execution", status="inprogress")
-
-                    # Execute the tool
-                    result = await self.tool_manager.execute_tool(tool_name, tool_input)
-
-                    # Determine if result indicates an error
-                    is_error = False
-                    result_content_for_llm = result
-                    if isinstance(result, str) and result.lower().startswith("error:"):
-                        is_error = True
-                    # Check dict format from execute_python_impl
-                    if isinstance(result, dict) and result.get("error"):
-                        is_error = True
-                        result_content_for_llm = f"Error during execution: {result['error']}"  # Pass error string to LLM
-
-                    # Format tool result as JSON, including LLM call ID
-                    result_output = {
-                        "id": llm_call_id,  # Add ID
-                        "type": "tool_result",
-                        "tool": tool_name,
-                        "success": not is_error,
-                    }
-
-                    # Format the result content based on its type
-                    if isinstance(result, dict):
-                        if "stdout" in result:
-                            result_output["stdout"] = result.get("stdout")
-                        if "error" in result:
-                            result_output["error"] = result.get("error")
-                    else:
-                        result_output["content"] = str(result)
-
-                    await self.project_manager.log(message=result_output, type="tool_result", status="complete")
-
-                    # Add tool result message to state for the *next* LLM call
-                    # Use the original tool_use_id provided by Anthropic
-                    self.project_manager.add_tool_result(
-                        tool_use_id=tool_use_id,
-                        result=result_content_for_llm,  # Send stringified/error detail to LLM
-                        is_error=is_error,
+                    tool_blocks.append(block)
+                else:
+                    handler = self._block_handlers.get(
+                        block.type, self._handle_unknown_block
                     )
+                    await handler(block, llm_call_id)
+            if tool_blocks:
+                executed_tool_this_turn = True
+                results = await asyncio.gather(
+                    *[self._execute_tool_block(b) for b in tool_blocks]
+                )
+                for block, result in zip(tool_blocks, results):
+                    await self._record_tool_result(block, result, llm_call_id)
 
             if (
                 not executed_tool_this_turn
                 and final_message.stop_reason == "stop_sequence"  # Use final_message
             ):
-                await self.project_manager.log(message="LLM finished turn without using a tool. Task may be stalled.", type="warning", status="inprogress")
+                await self.project_manager.log(message="LLM finished turn without using a tool. Task may be stalled.", type=_T_WARNING, status="inprogress")
+
+            # Flush buffered project changes with one commit per iteration
+            await self.project_manager.save_if_dirty()
 
             await self.project_manager.log(message="Iteration finished: " + str(iterations))
 
         # Loop finished
         # Add ID 'final' to these terminal messages
-        await self.project_manager.log(message="Execution complete", type="info", status="complete")
+        await self.project_manager.log(message="Execution complete", type=_T_INFO, status="complete")
         if self.project_manager.check_done():
             final_answer = self.project_manager.get_final_answer()
-            await self.project_manager.log(message=final_answer, type="findings", status="complete")
+            await self.project_manager.log(message=final_answer, type=_T_FINDINGS, status="complete")
         elif iterations >= max_iterations:
-            await self.project_manager.log(message="Task exceeded maximum iterations.", type="message", status="incomplete")
+            await self.project_manager.log(message="Task exceeded maximum iterations.", type=_T_MESSAGE, status="incomplete")
         else:
-            await self.project_manager.log(message="Agent loop exited unexpectedly.", type="message", status="error")
+            await self.project_manager.log(message="Agent loop exited unexpectedly.", type=_T_MESSAGE, status="error")
+
+        # Final persistence barrier: set_done()'s drain runs mid-turn, before
+        # the last tool result and the closing save_if_dirty spawn their
+        # writes, so flush and join here to make the final answer and last
+        # message rows durable before the run returns.
+        await self.project_manager.save_if_dirty()
+        await self.project_manager.drain()
 
         return self.project_manager.get_final_answer()
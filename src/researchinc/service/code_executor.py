@@ -1,18 +1,31 @@
 import contextlib
+import functools
 import io
 import logging
-from typing import Any, Dict
+from types import MappingProxyType
+from typing import Any, Dict, Mapping
 from functools import partial
 
 logger = logging.getLogger("CLI_Agent")
 
 
+@functools.lru_cache(maxsize=256)
+def _compile_cached(code_string: str):
+    """Compiles a snippet once; retries with identical code reuse the object."""
+    return compile(code_string, "<string>", "exec")
+
+
 class CodeExecutor:
     """Executes Python code snippets within a controlled, persistent context."""
 
     def __init__(self, initial_globals: Dict[str, Any]):
-        self.globals_locals: Dict[str, Any] = initial_globals.copy()
-        
+        # dict subclasses (the lazy-import globals) must keep their type:
+        # .copy() would downgrade them to a plain dict and kill __missing__
+        if type(initial_globals) is dict:
+            self.globals_locals: Dict[str, Any] = initial_globals.copy()
+        else:
+            self.globals_locals = initial_globals
+
         logger.info(
             f"CodeExecutor initialized with globals: {list(self.globals_locals.keys())}"
         )
@@ -22,11 +35,15 @@ class CodeExecutor:
         logger.info(f"Executing code:\n---\n{code_string}\n---")
         stdout_capture = io.StringIO()
         error_message = None
-        globals_before = self.globals_locals.copy()
 
         try:
             with contextlib.redirect_stdout(stdout_capture):
-                compiled_code = compile(code_string, "<string>", "exec")
+                compiled_code = _compile_cached(code_string)
+                # Single namespace: globals and locals must be the same dict,
+                # or functions and comprehensions defined at the top level
+                # can't see the snippet's own bindings. Bindings land
+                # directly in the persistent scope, so there is no
+                # copy-and-diff cost per call either.
                 exec(compiled_code, self.globals_locals)
         except Exception as e:
             error_message = f"{type(e).__name__}: {e}"
@@ -36,21 +53,12 @@ class CodeExecutor:
         if stdout_result:
             logger.info(f"Execution stdout:\n{stdout_result}")
 
-        updated_globals = {
-            k: v
-            for k, v in self.globals_locals.items()
-            if k not in globals_before or globals_before[k] is not v
-        }
-        if "__builtins__" in updated_globals and updated_globals[
-            "__builtins__"
-        ] == globals_before.get("__builtins__"):
-            del updated_globals["__builtins__"]
-
         return {
             "stdout": stdout_result,
             "error": error_message,
-            "updated_globals": updated_globals,
         }
 
-    def get_current_globals(self) -> Dict[str, Any]:
-        return self.globals_locals.copy()
+    def get_current_globals(self) -> Mapping[str, Any]:
+        # Read-only view: callers only inspect the scope, so skip the O(N)
+        # copy that grows with every executed snippet
+        return MappingProxyType(self.globals_locals)
@@ -1,9 +1,9 @@
 import logging
 import os
 import uuid
-from typing import Any, Dict, Iterator, List, Tuple
+from typing import Any, AsyncIterator, Dict, List, Tuple
 
-from anthropic import Anthropic
+from anthropic import AsyncAnthropic
 
 logger = logging.getLogger("CLI_Agent")
 
@@ -15,14 +15,53 @@ class LLM:
         self.api_key = api_key or os.getenv("ANTHROPIC_API_KEY")
         if self.api_key:
             logger.info("Initializing Anthropic API client.")
-            self.client = Anthropic(api_key=self.api_key)
+            self.client = AsyncAnthropic(api_key=self.api_key)
         else:
             raise ValueError("No API credentials configured for Anthropic.")
 
         self.model_id = model_id or os.getenv("MODEL_ID", "claude-3-7-sonnet-latest")
         logger.info(f"Using model: {self.model_id}")
+        self._system_cache = None
+        self._tools_cache = None
 
-    def generate_response(
+    def _shape_tools(self, tools: List[Dict[str, Any]]):
+        """Tags the last tool with cache_control, reused per tool list.
+
+        Marking the end of the tool block extends Anthropic's prompt cache
+        over the (large, static) tool schemas as well.
+        """
+        cached = self._tools_cache
+        if cached is not None and cached[0] is tools:
+            return cached[1]
+        if tools:
+            shaped = list(tools)
+            shaped[-1] = {**shaped[-1], "cache_control": {"type": "ephemeral"}}
+        else:
+            shaped = tools
+        self._tools_cache = (tools, shaped)
+        return shaped
+
+    def _shape_system(self, system_prompt: str):
+        """Wraps the system prompt in a cache_control block, reused per prompt.
+
+        Tagging the prompt as ephemeral lets Anthropic cache its tokens
+        server-side, cutting input-token cost and time-to-first-token on
+        every turn after the first.
+        """
+        cached = self._system_cache
+        if cached is not None and cached[0] == system_prompt:
+            return cached[1]
+        shaped = [
+            {
+                "type": "text",
+                "text": system_prompt,
+                "cache_control": {"type": "ephemeral"},
+            }
+        ]
+        self._system_cache = (system_prompt, shaped)
+        return shaped
+
+    async def generate_response(
         self,
         messages: List[Dict[str, Any]],
         system_prompt: str,
@@ -33,11 +72,11 @@ class LLM:
             f"Sending request to {self.model_id} with {len(messages)} messages and {len(tools)} tools."
         )
         try:
-            response = self.client.messages.create(
+            response = await self.client.messages.create(
                 model=self.model_id,
-                system=system_prompt,
+                system=self._shape_system(system_prompt),
                 messages=messages,
-                tools=tools,
+                tools=self._shape_tools(tools),
                 tool_choice={"type": "auto"},
                 max_tokens=4096,
                 temperature=0.1,
@@ -48,14 +87,16 @@ class LLM:
             logger.error(f"Anthropic API call failed: {e}", exc_info=True)
             return None
 
-    def generate_response_stream(
+    async def generate_response_stream(
         self,
         messages: List[Dict[str, Any]],
         system_prompt: str,
         tools: List[Dict[str, Any]],
-    ) -> Iterator[Dict[str, Any]]:
+    ) -> AsyncIterator[Dict[str, Any]]:
         """Sends messages to the Anthropic API and streams the response, yielding chunks.
-        The generator finally returns a tuple: (llm_call_id, final_message_object).
+        The last chunk is a terminal {"type": "__final__"} carrying the llm_call_id
+        and the complete message object (None if the stream failed), so consumers
+        never have to fish the result out of StopIteration.
         """
         llm_call_id = str(uuid.uuid4())
         logger.info(
@@ -63,16 +104,16 @@ class LLM:
         )
         final_message = None
         try:
-            with self.client.messages.stream(
+            async with self.client.messages.stream(
                 model=self.model_id,
-                system=system_prompt,
+                system=self._shape_system(system_prompt),
                 messages=messages,
-                tools=tools,
+                tools=self._shape_tools(tools),
                 tool_choice={"type": "auto"},
                 max_tokens=4096,
                 temperature=0.1,  # Adjust temperature as needed
             ) as stream:
-                for event in stream:
+                async for event in stream:
                     # Yield text chunks as they arrive
                     if (
                         event.type == "content_block_delta"
@@ -86,8 +127,9 @@ class LLM:
                     # Handle other event types if needed (e.g., tool_use start/delta/stop)
                     # For now, we focus on text streaming and getting the final message.
 
-            # After the stream context manager exits, get the final message
-            final_message = stream.get_final_message()
+                # Collect the accumulated final message before leaving the
+                # stream context
+                final_message = await stream.get_final_message()
             logger.info(
                 f"Stream finished (ID: {llm_call_id}). Stop reason: {final_message.stop_reason}"
             )
@@ -102,8 +144,9 @@ class LLM:
                 "type": "error",
                 "content": f"LLM stream failed: {e}",
             }
-            # Ensure the return value indicates failure
-            return llm_call_id, None
+            # Terminal chunk indicating failure
+            yield {"id": llm_call_id, "type": "__final__", "message": None}
+            return
 
-        # Return the ID and the complete message object via the generator's return value
-        return llm_call_id, final_message
+        # Terminal chunk carrying the ID and the complete message object
+        yield {"id": llm_call_id, "type": "__final__", "message": final_message}
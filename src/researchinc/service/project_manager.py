@@ -1,12 +1,60 @@
+import asyncio
 import json
-from researchinc.utils.logging_config import setup_logging
+import logging
+import sys
+import threading
+from collections import deque
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - fall back to stdlib json
+    orjson = None
+try:
+    import msgspec
+except ImportError:  # pragma: no cover - plain dicts when msgspec is absent
+    msgspec = None
 from typing import Any, Callable, Dict, List, Optional
 from researchinc.repositories.project_repository import ProjectRepository
 import uuid
-logger = setup_logging()
 
-# Templates
-PLAN_TEMPLATE = """
+# Handler setup is the entrypoints' job (setup_logging there); library
+# modules just grab the named logger without re-walking its handler list
+# on every import
+logger = logging.getLogger("researchinc")
+
+# Interned event type tags shared by every callback payload
+_T_MESSAGE = sys.intern("message")
+_T_PLAN = sys.intern("plan")
+_T_FINDINGS = sys.intern("findings")
+_T_DONE = sys.intern("done")
+_T_ERROR = sys.intern("error")
+
+# Tool results beyond this size are truncated before being stored: the
+# history is re-sent to Anthropic on every turn, so unbounded outputs
+# dominate token cost.
+TOOL_RESULT_MAX_CHARS = 32 * 1024
+
+# Number of recent messages kept verbatim in the context window; older
+# messages are compacted into a rolling summary instead of being re-sent
+# to the LLM on every turn.
+HISTORY_WINDOW = 40
+
+if msgspec is not None:
+    class ToolResultBlock(msgspec.Struct):
+        """Slotted tool_result block: ~half the per-item memory of a dict.
+
+        Converted back to builtins in get_history before the payload goes
+        to the Anthropic client.
+        """
+
+        type: str
+        tool_use_id: str
+        is_error: bool
+        content: str
+
+
+# Templates (interned so template-equality checks are pointer compares)
+PLAN_TEMPLATE = sys.intern("""
 # Research Agent Progress Tracking
 
 ## Completed Milestones
@@ -17,9 +65,9 @@ PLAN_TEMPLATE = """
 - [ ] Define initial approach
 
 *(Agent will update this structure)*
-"""
+""")
 
-FINDINGS_TEMPLATE = """
+FINDINGS_TEMPLATE = sys.intern("""
 # Research Findings
 
 ## Summary
@@ -30,7 +78,23 @@ FINDINGS_TEMPLATE = """
 
 ## Confidence Score
 *(Agent should assess confidence, e.g., High/Medium/Low)*
-"""
+""")
+
+# One repository per process: sessions come from the factory per unit of
+# work anyway, so every ProjectManager can share the same instance instead
+# of constructing one per task.
+_REPO_SINGLETON: Optional[ProjectRepository] = None
+_REPO_LOCK = threading.Lock()
+
+
+def _get_repo() -> ProjectRepository:
+    global _REPO_SINGLETON
+    if _REPO_SINGLETON is None:
+        with _REPO_LOCK:
+            if _REPO_SINGLETON is None:
+                _REPO_SINGLETON = ProjectRepository()
+    return _REPO_SINGLETON
+
 
 class ProjectManager:
     """Manages the agent's state: history, plan, findings, execution scope."""
@@ -38,23 +102,91 @@ class ProjectManager:
     def __init__(self, initial_task: str, system_prompt: str, project_id: str, callback: Callable[[Dict[str, Any]], None]):
         self.callback = callback
         self.project_id = project_id
-        self.project_repository = ProjectRepository()
-        self.project = self.project_repository.get_or_create(project_id)
-        self.message_history = [{"role":"user","content":initial_task}]
-        self.project.system_prompt = system_prompt
-        self.project.plan = PLAN_TEMPLATE
-        self.project.findings = FINDINGS_TEMPLATE
+        self.project_repository = _get_repo()
+        self.project = None  # Loaded asynchronously via load_project()
+        self.system_prompt = system_prompt
+        self.message_history = deque(maxlen=HISTORY_WINDOW)
+        self._rolling_summary: Optional[str] = None
+        # Message rows are buffered and bulk-inserted at iteration boundaries
+        # instead of paying a commit per message
+        self._pending_rows: List[Dict[str, Any]] = []
+        # Callback events are queued and delivered by a single flusher task:
+        # a turn that updates plan then records findings pays one task
+        # scheduling instead of one awaited send per event. At most one
+        # flusher runs at a time, so ordering is preserved.
+        self._event_queue: asyncio.Queue = asyncio.Queue()
+        self._flusher_task: Optional[asyncio.Task] = None
+        # Background persistence tasks: saves overlap with the next LLM call
+        # instead of blocking the agent loop; drain() joins them
+        self._pending: set = set()
+        self._append_history({"role":"user","content":initial_task})
         self.execution_globals: Dict[str, Any] = {}
         self._is_done: bool = False
+        # Project mutations are buffered and flushed once per agent iteration
+        # via save_if_dirty() instead of paying a commit per write
+        self._dirty: bool = False
+
+    async def load_project(self):
+        """Loads (or creates) the backing project row. Await before first use."""
+        self.project = await self.project_repository.get(self.project_id)
+        if self.project is None:
+            self.project = await self.project_repository.create(self.project_id)
+        self.project.system_prompt = self.system_prompt
+        # Only seed the templates on a fresh project: a resumed project's
+        # plan/findings are real progress, and overwriting them both
+        # clobbers state and forces a pointless write on save
+        if not getattr(self.project, "plan", None):
+            self.project.plan = PLAN_TEMPLATE
+        if not getattr(self.project, "findings", None):
+            self.project.findings = FINDINGS_TEMPLATE
         self.project.final_answer = None
 
     async def save(self):
-        self.project_repository.put(self.project)
+        await self.project_repository.put(self.project)
+        self._dirty = False
+
+    async def save_if_dirty(self):
+        """Schedules persistence of buffered changes without blocking the loop.
+
+        The writes run as a background task overlapping the next agent
+        iteration; drain() (called from set_done and at the end of the run)
+        joins them. The message-row insert and the project update are
+        ordered within one task rather than raced.
+        """
+        rows = None
+        if self._pending_rows:
+            rows, self._pending_rows = self._pending_rows, []
+        save_project = self._dirty and self.project is not None
+        if save_project:
+            self._dirty = False
+        if rows or save_project:
+            self._spawn(self._persist(rows, save_project))
+
+    async def _persist(self, rows: Optional[List[Dict[str, Any]]], save_project: bool):
+        if rows:
+            await self.project_repository.bulk_add_messages(rows)
+        if save_project:
+            await self.project_repository.put(self.project)
+
+    def _spawn(self, coro) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+        return task
+
+    async def drain(self):
+        """Joins background saves and queued events; call before finishing."""
+        if self._pending:
+            await asyncio.gather(*self._pending)
+        await self._drain_events()
 
     async def log(self, message: str = "", type: str = "info",  status: str = "inprogress"):
         # Convert dictionary messages to JSON strings
         if isinstance(message, dict):
-            message = json.dumps(message)
+            if orjson is not None:
+                message = orjson.dumps(message).decode()
+            else:
+                message = json.dumps(message)
         logger.info(message)
 
     def add_message(self, role: str, content: Any):
@@ -78,40 +210,205 @@ class ProjectManager:
             elif not isinstance(content, list):
                 content = [{"type": "text", "text": str(content)}]  # Simple user text
 
-        self.message_history.append({"role": role, "content": content})
+        self._append_history({"role": role, "content": content})
+
+    def _add_assistant(self, content_blocks: List[Dict[str, Any]]):
+        """Appends assistant content blocks, skipping add_message's checks.
+
+        Callers guarantee a non-empty list of block dicts, so the
+        per-message isinstance cascade is dead weight on this hot path.
+        """
+        self._append_history({"role": "assistant", "content": content_blocks})
+
+    def _add_user(self, content_blocks: List[Dict[str, Any]]):
+        """Appends pre-formatted user content blocks (e.g. tool results)."""
+        self._append_history({"role": "user", "content": content_blocks})
+
+    def _append_history(self, message: Dict[str, Any]):
+        """Appends to the bounded history, compacting the oldest message when full."""
+        if len(self.message_history) == self.message_history.maxlen:
+            self._compact_into_summary(self.message_history.popleft())
+            # Never leave the window starting on a tool_result whose
+            # matching tool_use was just evicted — Anthropic rejects an
+            # orphaned tool_result with a 400. Keep compacting until the
+            # head is a plain message, so pairs always leave together.
+            while self.message_history and self._is_tool_result_message(
+                self.message_history[0]
+            ):
+                self._compact_into_summary(self.message_history.popleft())
+        self.message_history.append(message)
+        self._queue_message_row(message)
+
+    @staticmethod
+    def _is_tool_result_message(message: Any) -> bool:
+        """True when a history message is a user message carrying tool results."""
+        if not isinstance(message, dict) or message.get("role") != "user":
+            return False
+        content = message.get("content")
+        if not isinstance(content, list) or not content:
+            return False
+        block = content[0]
+        if isinstance(block, dict):
+            return block.get("type") == "tool_result"
+        return msgspec is not None and isinstance(block, ToolResultBlock)
+
+    def _queue_message_row(self, message: Dict[str, Any]):
+        """Buffers a history message as a ProjectMessage row for bulk insert."""
+        content = message.get("content")
+        if not isinstance(content, str):
+            content = self._encode_content(content)
+        self._pending_rows.append({
+            "event_id": str(uuid.uuid4()),
+            "project_id": self.project_id,
+            "role": message.get("role", "user"),
+            "content": content,
+        })
+
+    def _compact_into_summary(self, evicted: Dict[str, Any]):
+        """Folds an evicted message into the rolling summary.
+
+        The full message is also spilled to the project's archived_history
+        (JSONL) so nothing is lost when it leaves the hot window; the spill
+        rides the existing dirty/save batching.
+        """
+        self._archive_message(evicted)
+        content = evicted.get("content")
+        if isinstance(content, list):
+            parts = []
+            for block in content:
+                if isinstance(block, dict):
+                    parts.append(block.get("text") or str(block.get("content", block.get("type", ""))))
+                elif msgspec is not None and isinstance(block, ToolResultBlock):
+                    parts.append(block.content)
+                else:
+                    parts.append(str(block))
+            text = " ".join(parts)
+        else:
+            text = str(content)
+        line = f"[{evicted.get('role', 'unknown')}] {text[:500]}"
+        if self._rolling_summary:
+            self._rolling_summary = self._rolling_summary + "\n" + line
+        else:
+            self._rolling_summary = "Summary of earlier conversation:\n" + line
+
+    def _encode_content(self, value: Any) -> str:
+        """JSON-encodes history content, handling msgspec structs and dicts."""
+        if msgspec is not None:
+            return msgspec.json.encode(value, enc_hook=str).decode()
+        if orjson is not None:
+            return orjson.dumps(value, default=str).decode()
+        return json.dumps(value, default=str)
+
+    def _archive_message(self, evicted: Dict[str, Any]):
+        """Appends an evicted message to the project's archived history."""
+        if self.project is None:
+            return
+        line = self._encode_content(evicted)
+        if self.project.archived_history:
+            self.project.archived_history = self.project.archived_history + "\n" + line
+        else:
+            self.project.archived_history = line
+        self._dirty = True
 
     def add_assistant_message(self, content_blocks: List[Dict[str, Any]]):
         """Adds the assistant's response (potentially multiple blocks) to history."""
         if content_blocks:
-            self.add_message(role="assistant", content=content_blocks)
+            self._add_assistant(content_blocks)
 
     def add_tool_result(self, tool_use_id: str, result: Any, is_error: bool = False):
         """Adds a tool result message linked to a tool_use request."""
-        content_block = {
-            "type": "tool_result",
-            "tool_use_id": tool_use_id,
-            "is_error": is_error,
-        }
-        # Content must be string or list of blocks (e.g. text block) for Anthropic
-        if isinstance(result, (dict, list)):
+        # Content must be string or list of blocks (e.g. text block) for Anthropic.
+        # Encode compactly: indentation adds ~30% more bytes for no model benefit.
+        # Exact-type dispatch: most tool results are already strings, so the
+        # common case is a passthrough instead of a str() round trip.
+        t = type(result)
+        if t is str:
+            content = result
+        elif t is bytes:
+            content = result.decode()
+        elif t is dict or t is list:
             # Convert complex results to string (JSON) for the LLM
-            content_block["content"] = json.dumps(result, indent=2)
+            if orjson is not None:
+                content = orjson.dumps(result).decode()
+            else:
+                content = json.dumps(result)
         else:
-            content_block["content"] = str(result)
+            content = str(result)
+        content = self._truncate_result(content)
+
+        if msgspec is not None:
+            content_block: Any = ToolResultBlock(
+                type="tool_result",
+                tool_use_id=tool_use_id,
+                is_error=is_error,
+                content=content,
+            )
+        else:
+            content_block = {
+                "type": "tool_result",
+                "tool_use_id": tool_use_id,
+                "is_error": is_error,
+                "content": content,
+            }
 
         # Add as a user message containing the single tool result block
-        self.add_message(role="user", content=[content_block])
+        self._add_user([content_block])
+
+    def _truncate_result(self, content: str) -> str:
+        """Caps oversized tool output before it enters the history."""
+        if len(content) <= TOOL_RESULT_MAX_CHARS:
+            return content
+        dropped = len(content) - TOOL_RESULT_MAX_CHARS
+        return content[:TOOL_RESULT_MAX_CHARS] + f"...[truncated {dropped} bytes]..."
 
     def get_history(self) -> List[Dict[str, Any]]:
-        return self.message_history
+        history = list(self.message_history)
+        if msgspec is not None:
+            # One C pass turns any structs back into the plain dicts the
+            # Anthropic client expects
+            history = msgspec.to_builtins(history, enc_hook=str)
+        if self._rolling_summary:
+            return [{"role": "user", "content": self._rolling_summary}] + history
+        return history
 
     def get_system_prompt(self) -> str:
         return self.system_prompt
 
+    def emit_message(self, content: str):
+        """Queues a streamed text chunk for delivery to the client.
+
+        These are the only events the websocket layer may shed under
+        backpressure, so they go through the queue like everything else but
+        are tagged type "message".
+        """
+        self._emit({
+            "type": _T_MESSAGE,
+            "content": content,
+            "content_type": "text"
+        })
+
+    def _emit(self, event: Dict[str, Any]):
+        """Queues a callback event and ensures a flusher task is running."""
+        self._event_queue.put_nowait(event)
+        if self._flusher_task is None or self._flusher_task.done():
+            self._flusher_task = asyncio.create_task(self._flusher())
+
+    async def _flusher(self):
+        """Drains queued events to the callback, then exits until re-armed."""
+        while not self._event_queue.empty():
+            await self.callback(self._event_queue.get_nowait())
+
+    async def _drain_events(self):
+        """Waits until every queued event has reached the callback."""
+        task = self._flusher_task
+        if task is not None and not task.done():
+            await task
+
     async def update_plan(self, plan_markdown: str):
         self.project.plan = plan_markdown
-        await self.callback({
-            "type": "plan",
+        self._dirty = True
+        self._emit({
+            "type": _T_PLAN,
             "content": plan_markdown,
             "content_type":"md"
         })
@@ -121,8 +418,9 @@ class ProjectManager:
 
     async def update_findings(self, findings_markdown: str):
         self.project.findings = findings_markdown
-        await self.callback({
-            "type": "findings",
+        self._dirty = True
+        self._emit({
+            "type": _T_FINDINGS,
             "content": findings_markdown,
             "content_type":"md"
         })
@@ -130,12 +428,6 @@ class ProjectManager:
     def get_findings(self) -> str:
         return self.project.findings
 
-    def update_globals(self, new_globals: Dict[str, Any]):
-        self.execution_globals.update(new_globals)
-
-    def get_globals(self) -> Dict[str, Any]:
-        return self.execution_globals
-
     def set_initial_globals(self, initial_globals: Dict[str, Any]):
         self.execution_globals = initial_globals
         logger.info("Initial execution globals set.")
@@ -143,11 +435,17 @@ class ProjectManager:
     async def set_done(self, final_answer: Any):
         self._is_done = True
         self.final_answer = final_answer
-        await self.callback({
-            "type": "done",
+        self.project.final_answer = final_answer
+        self._dirty = True
+        self._emit({
+            "type": _T_DONE,
             "content": final_answer,
             "content_type":"text"
         })
+        # "done" must be the last event the client sees: join outstanding
+        # saves and wait for the flusher to deliver everything queued ahead
+        # of it (and itself)
+        await self.drain()
         logger.info(f"Agent marked as done. Final Answer: {final_answer}")
 
     def check_done(self) -> bool:
@@ -158,8 +456,8 @@ class ProjectManager:
     
 
     async def log_error(self, message: str):
-        await self.callback({
-            "type": "error",
+        self._emit({
+            "type": _T_ERROR,
             "content": message,
             "content_type":"text"
         })
@@ -1,18 +1,55 @@
+import functools
+import io
 import json
-from typing import List
+from typing import List, Tuple
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - fall back to stdlib json
+    orjson = None
+
+
+def _dump_schema(schema: dict) -> str:
+    if orjson is not None:
+        return orjson.dumps(schema).decode()
+    return json.dumps(schema)
 
 
 def get_system_prompt(
     tool_definitions: List[dict], authorized_imports: List[str]
 ) -> str:
-    """Generates the system prompt including dynamic tool and import info."""
-    formatted_tool_descriptions = "\n\n".join(
-        [
-            f"**Tool: `{tool['name']}`**\nDescription: {tool['description']}\nInput Schema: {json.dumps(tool['input_schema'])}"
-            for tool in tool_definitions
-        ]
+    """Generates the system prompt including dynamic tool and import info.
+
+    The prompt is a pure function of the tool definitions and import list,
+    which are the same for every session, so the actual build is memoized
+    behind hashable keys.
+    """
+    tools_key = tuple(
+        (tool["name"], tool["description"], _dump_schema(tool["input_schema"]))
+        for tool in tool_definitions
     )
-    auth_imports_list = ", ".join(authorized_imports) if authorized_imports else "None"
+    imports_key = tuple(authorized_imports)
+    return _build(tools_key, imports_key)
+
+
+@functools.lru_cache(maxsize=32)
+def _build(
+    tools_key: Tuple[Tuple[str, str, str], ...], imports_key: Tuple[str, ...]
+) -> str:
+    # Stream the descriptions into one buffer instead of materializing an
+    # intermediate string per tool before the join
+    buf = io.StringIO()
+    for i, (name, description, schema) in enumerate(tools_key):
+        if i:
+            buf.write("\n\n")
+        buf.write("**Tool: `")
+        buf.write(name)
+        buf.write("`**\nDescription: ")
+        buf.write(description)
+        buf.write("\nInput Schema: ")
+        buf.write(schema)
+    formatted_tool_descriptions = buf.getvalue()
+    auth_imports_list = ", ".join(imports_key) if imports_key else "None"
 
     # Using the same detailed prompt structure
     prompt = f"""You are an expert research assistant agent designed to solve complex tasks step-by-step using a limited set of tools. Your goal is to fully address the user's TASK.
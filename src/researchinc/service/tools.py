@@ -1,10 +1,13 @@
+import asyncio
+import functools
 import inspect
 import json
-from researchinc.utils.logging_config import setup_logging
+import logging
 import random
 from typing import TYPE_CHECKING, Any, Callable, Dict, List
 
-logger = setup_logging()
+# Handler setup happens in the entrypoints; just resolve the named logger
+logger = logging.getLogger("researchinc")
 
 # Import for type checking only to avoid circular imports
 if TYPE_CHECKING:
@@ -24,8 +27,6 @@ def execute_python_impl(
     """
     logger.info("Executing python code via tool.")
     result = code_executor.execute(code)
-    if result.get("updated_globals"):
-        project_manager.update_globals(result["updated_globals"])
     return {
         "stdout": result["stdout"],
         "error": result["error"],  # Will be None if successful
@@ -53,7 +54,30 @@ async def final_answer_impl(project_manager: "ProjectManager", result: Any) -> A
     return result
 
 
+def tool(schema: Dict[str, Any]) -> Callable:
+    """Attaches a pre-built input_schema to a tool function.
+
+    Tools annotated this way skip inspect.signature/getdoc introspection
+    when definitions are built: the schema is fixed at definition time.
+    """
+
+    def deco(f: Callable) -> Callable:
+        f._tool_schema = schema
+        return f
+
+    return deco
+
+
 # --- Custom Tool Implementations ---
+@tool(
+    {
+        "type": "object",
+        "properties": {
+            "query": {"type": "string", "description": "The search query."}
+        },
+        "required": ["query"],
+    }
+)
 def search(query: str) -> str:
     """
     Simulates a web search for a given query. Returns simulated results.
@@ -70,111 +94,97 @@ def search(query: str) -> str:
     return "\n".join(random.sample(results, k=random.randint(1, len(results))))
 
 
-class ToolManager:
-    """Manages tool definitions, schemas, and execution mapping."""
+# Built-in tools that manage agent state/execution, as opposed to custom
+# tools exposed to generated code
+_BUILTIN_TOOLS = frozenset(
+    {"execute_python", "update_plan", "record_findings", "final_answer"}
+)
 
-    def __init__(
-        self,
-        project_manager: "ProjectManager",
-        code_executor: "CodeExecutor",
-        allowed_imports: List[str],
-    ):
-        # No need to import here since we have TYPE_CHECKING imports at the module level
-        self.project_manager = project_manager
-        self.code_executor = code_executor
-        self.allowed_imports = allowed_imports
-        self._tools: Dict[str, Callable] = {}
-        self._tool_implementations: Dict[str, Callable] = {}  # Store actual functions
-        self._tool_definitions: List[Dict[str, Any]] = []
-        self._load_tools()
-        self._generate_tool_definitions()
-        logger.info(
-            f"ToolManager initialized with tools: {list(self._tool_implementations.keys())}"
-        )
+# Default tool set: static module globals, so the (introspection-heavy)
+# definitions can be built once at import time instead of per session
+_DEFAULT_TOOL_IMPLS: Dict[str, Callable] = {
+    "execute_python": execute_python_impl,
+    "update_plan": update_plan_impl,
+    "record_findings": record_findings_impl,
+    "final_answer": final_answer_impl,
+    "search": search,
+}
 
-    def _load_tools(self):
-        """Loads tool implementation functions from the current script scope."""
-        # Map tool name to implementation function defined globally in this script
-        self._tool_implementations["execute_python"] = execute_python_impl
-        self._tool_implementations["update_plan"] = update_plan_impl
-        self._tool_implementations["record_findings"] = record_findings_impl
-        self._tool_implementations["final_answer"] = final_answer_impl
-        self._tool_implementations["search"] = search  # Custom tool
 
-    def _generate_tool_definitions(self):
-        """Generates Anthropic-compatible tool definitions."""
-        definitions = []
-        # Built-in tools (manual schema definition)
-        definitions.append(
-            {
-                "name": "execute_python",
-                "description": f"Executes a snippet of Python code. State persists. Has access to the following imports: datetime, timedelta, pandas. Does not use any other imports. Use print() for output.",
-                "input_schema": {
-                    "type": "object",
-                    "properties": {
-                        "code": {"type": "string", "description": "The Python code."}
-                    },
-                    "required": ["code"],
+def _build_tool_definitions(
+    tool_implementations: Dict[str, Callable]
+) -> List[Dict[str, Any]]:
+    """Builds Anthropic-compatible tool definitions for an implementation map."""
+    definitions = []
+    # Built-in tools (manual schema definition)
+    definitions.append(
+        {
+            "name": "execute_python",
+            "description": f"Executes a snippet of Python code. State persists. Has access to the following imports: datetime, timedelta, pandas. Does not use any other imports. Use print() for output.",
+            "input_schema": {
+                "type": "object",
+                "properties": {
+                    "code": {"type": "string", "description": "The Python code."}
                 },
-            }
-        )
-        definitions.append(
-            {
-                "name": "update_plan",
-                "description": "Updates the agent's plan (Markdown checklist). Call at start of each reasoning step.",
-                "input_schema": {
-                    "type": "object",
-                    "properties": {
-                        "plan_markdown": {
-                            "type": "string",
-                            "description": "Complete updated plan in Markdown.",
-                        }
-                    },
-                    "required": ["plan_markdown"],
+                "required": ["code"],
+            },
+        }
+    )
+    definitions.append(
+        {
+            "name": "update_plan",
+            "description": "Updates the agent's plan (Markdown checklist). Call at start of each reasoning step.",
+            "input_schema": {
+                "type": "object",
+                "properties": {
+                    "plan_markdown": {
+                        "type": "string",
+                        "description": "Complete updated plan in Markdown.",
+                    }
                 },
-            }
-        )
-        definitions.append(
-            {
-                "name": "record_findings",
-                "description": "Records final findings/conclusions (Markdown). Call before final_answer.",
-                "input_schema": {
-                    "type": "object",
-                    "properties": {
-                        "findings_markdown": {
-                            "type": "string",
-                            "description": "Summary of findings in Markdown.",
-                        }
-                    },
-                    "required": ["findings_markdown"],
+                "required": ["plan_markdown"],
+            },
+        }
+    )
+    definitions.append(
+        {
+            "name": "record_findings",
+            "description": "Records final findings/conclusions (Markdown). Call before final_answer.",
+            "input_schema": {
+                "type": "object",
+                "properties": {
+                    "findings_markdown": {
+                        "type": "string",
+                        "description": "Summary of findings in Markdown.",
+                    }
                 },
-            }
-        )
-        definitions.append(
-            {
-                "name": "final_answer",
-                "description": "Provides the final answer to the user's task and concludes operation.",
-                "input_schema": {
-                    "type": "object",
-                    "properties": {
-                        "result": {"type": "string", "description": "The final answer."}
-                    },
-                    "required": ["result"],
+                "required": ["findings_markdown"],
+            },
+        }
+    )
+    definitions.append(
+        {
+            "name": "final_answer",
+            "description": "Provides the final answer to the user's task and concludes operation.",
+            "input_schema": {
+                "type": "object",
+                "properties": {
+                    "result": {"type": "string", "description": "The final answer."}
                 },
-            }
-        )
+                "required": ["result"],
+            },
+        }
+    )
 
-        # Custom tools (generate schema from signature/docstring)
-        for name, func in self._tool_implementations.items():
-            if name in [
-                "execute_python",
-                "update_plan",
-                "record_findings",
-                "final_answer",
-            ]:
-                continue  # Skip built-ins already defined
-
-            docstring = inspect.getdoc(func) or f"Executes the {name} tool."
+    # Custom tools (generate schema from signature/docstring)
+    for name, func in tool_implementations.items():
+        if name in _BUILTIN_TOOLS:
+            continue  # Skip built-ins already defined
+
+        docstring = inspect.getdoc(func) or f"Executes the {name} tool."
+        schema = getattr(func, "_tool_schema", None)
+        if schema is None:
+            # No @tool schema attached: fall back to signature introspection
             sig = inspect.signature(func)
             properties = {}
             required = []
@@ -196,23 +206,104 @@ class ToolManager:
                 }
                 if param.default == inspect.Parameter.empty:
                     required.append(param_name)
+            schema = {
+                "type": "object",
+                "properties": properties,
+                "required": required,
+            }
 
-            definitions.append(
-                {
-                    "name": name,
-                    "description": docstring.split("\n")[0],
-                    "input_schema": {
-                        "type": "object",
-                        "properties": properties,
-                        "required": required,
-                    },
-                }
+        definitions.append(
+            {
+                "name": name,
+                "description": docstring.split("\n")[0],
+                "input_schema": schema,
+            }
+        )
+        logger.debug(f"Generated definition for custom tool: {name}")
+
+    return definitions
+
+
+# Built once at import: every session with the default tool set reuses these
+_CACHED_TOOL_DEFS: List[Dict[str, Any]] = _build_tool_definitions(_DEFAULT_TOOL_IMPLS)
+
+
+class ToolManager:
+    """Manages tool definitions, schemas, and execution mapping."""
+
+    def __init__(
+        self,
+        project_manager: "ProjectManager",
+        code_executor: "CodeExecutor",
+        allowed_imports: List[str],
+    ):
+        # No need to import here since we have TYPE_CHECKING imports at the module level
+        self.project_manager = project_manager
+        self.code_executor = code_executor
+        self.allowed_imports = allowed_imports
+        self._tools: Dict[str, Callable] = {}
+        self._tool_implementations: Dict[str, Callable] = {}  # Store actual functions
+        self._tool_definitions: List[Dict[str, Any]] = []
+        # Version counter for cache invalidation: bumped whenever the tool set
+        # changes so the memoized getters rebuild lazily.
+        self._version = 0
+        self._tool_defs_version = -1
+        self._callables_cache: Dict[str, Callable] = {}
+        self._callables_version = -1
+        # Serializes execute_python: concurrent code execution would corrupt
+        # the shared globals scope
+        self._exec_lock = asyncio.Lock()
+        self._load_tools()
+        self._generate_tool_definitions()
+        self._tool_defs_version = self._version
+        logger.info(
+            f"ToolManager initialized with tools: {list(self._tool_implementations.keys())}"
+        )
+
+    def _load_tools(self):
+        """Loads tool implementation functions from the current script scope."""
+        # Map tool name to implementation function defined globally in this script
+        for name, func in _DEFAULT_TOOL_IMPLS.items():
+            self.register_tool(name, func)
+        # Built-in dispatch table constructed once: execute_tool does a dict
+        # lookup instead of re-running a name-comparison cascade per call
+        self._dispatch: Dict[str, Callable] = {
+            "execute_python": self._run_exec,
+            "update_plan": functools.partial(self._run_pm, update_plan_impl),
+            "record_findings": functools.partial(self._run_pm, record_findings_impl),
+            "final_answer": functools.partial(self._run_pm, final_answer_impl),
+        }
+
+    async def _run_exec(self, tool_args: Dict[str, Any]) -> Any:
+        # Serialized: concurrent code execution would corrupt shared globals
+        async with self._exec_lock:
+            return execute_python_impl(
+                self.code_executor, self.project_manager, **tool_args
             )
-            logger.debug(f"Generated definition for custom tool: {name}")
 
-        self._tool_definitions = definitions
+    async def _run_pm(self, fn: Callable, tool_args: Dict[str, Any]) -> Any:
+        return await fn(self.project_manager, **tool_args)
+
+    def register_tool(self, name: str, func: Callable):
+        """Registers a tool implementation and invalidates the cached views."""
+        self._tool_implementations[name] = func
+        self._version += 1
+
+    def _generate_tool_definitions(self):
+        """Generates Anthropic-compatible tool definitions."""
+        if self._tool_implementations == _DEFAULT_TOOL_IMPLS:
+            # Unmodified default tool set: reuse the definitions built at
+            # import time instead of re-running introspection per session
+            self._tool_definitions = _CACHED_TOOL_DEFS
+        else:
+            self._tool_definitions = _build_tool_definitions(
+                self._tool_implementations
+            )
 
     def get_tool_definitions(self) -> List[Dict[str, Any]]:
+        if self._tool_defs_version != self._version:
+            self._generate_tool_definitions()
+            self._tool_defs_version = self._version
         return self._tool_definitions
 
     async def execute_tool(self, tool_name: str, tool_args: Dict[str, Any]) -> Any:
@@ -225,13 +316,10 @@ class ToolManager:
         logger.info(f"Executing tool '{tool_name}' with args: {tool_args}")
 
         try:
-            # Inject dependencies for built-in tools requiring state/executor
-            if tool_name == "execute_python":
-                result = tool_function(
-                    self.code_executor, self.project_manager, **tool_args
-                )
-            elif tool_name in ["update_plan", "record_findings", "final_answer"]:
-                result = await tool_function(self.project_manager, **tool_args)
+            # Built-ins go through pre-bound wrappers that inject state/executor
+            handler = self._dispatch.get(tool_name)
+            if handler is not None:
+                result = await handler(tool_args)
             else:
                 # Execute custom tools directly
                 result = tool_function(**tool_args)
@@ -245,14 +333,13 @@ class ToolManager:
 
     def get_callable_tools_for_eval(self) -> Dict[str, Callable]:
         """Returns custom tools suitable for CodeExecutor's global scope."""
+        if self._callables_version == self._version:
+            return self._callables_cache
         eval_tools = {}
         for name, func in self._tool_implementations.items():
             # Exclude built-ins that manage agent state/execution
-            if name not in [
-                "execute_python",
-                "update_plan",
-                "record_findings",
-                "final_answer",
-            ]:
+            if name not in _BUILTIN_TOOLS:
                 eval_tools[name] = func
+        self._callables_cache = eval_tools
+        self._callables_version = self._version
         return eval_tools
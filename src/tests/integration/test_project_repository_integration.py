@@ -9,50 +9,53 @@ def generate_unique_id():
     """Generate a unique ID for testing to avoid conflicts"""
     return str(uuid.uuid4())
 
-def test_put_project_integration():
+@pytest.mark.asyncio
+async def test_put_project_integration():
     project_repository = ProjectRepository()
     project_id = generate_unique_id()
     
     # Clean up any existing project with this ID (just in case)
-    project_repository.delete(project_id)
+    await project_repository.delete(project_id)
     
     project = Project(project_id=project_id)
-    project_repository.put(project)
-    retrieved_project = project_repository.get(project.project_id)
+    await project_repository.put(project)
+    retrieved_project = await project_repository.get(project.project_id)
     assert retrieved_project is not None
     assert retrieved_project.project_id == project.project_id
-    project_repository.delete(project.project_id)
+    await project_repository.delete(project.project_id)
 
-def test_put_project_updates_existing_integration():
+@pytest.mark.asyncio
+async def test_put_project_updates_existing_integration():
     project_repository = ProjectRepository()
     project_id = generate_unique_id()
     
     # Clean up any existing project with this ID (just in case)
-    project_repository.delete(project_id)
+    await project_repository.delete(project_id)
     project = Project(project_id=project_id)
-    project_repository.put(project)
+    await project_repository.put(project)
     project.plan = "new plan"
-    project_repository.put(project)
+    await project_repository.put(project)
     
-    retrieved_project = project_repository.get(project.project_id)
+    retrieved_project = await project_repository.get(project.project_id)
     assert retrieved_project is not None
     assert retrieved_project.plan == "new plan"
     
-    project_repository.delete(project.project_id)
+    await project_repository.delete(project.project_id)
 
-def test_delete_project_delete_integration():
+@pytest.mark.asyncio
+async def test_delete_project_delete_integration():
     project_repository = ProjectRepository()
     project_id = generate_unique_id()
     
     # Clean up any existing project with this ID (just in case)
-    project_repository.delete(project_id)
+    await project_repository.delete(project_id)
     
     project = Project(project_id=project_id)
-    project_repository.put(project)
+    await project_repository.put(project)
     
     # Delete the project
-    project_repository.delete(project.project_id)
+    await project_repository.delete(project.project_id)
     
     # Verify project is deleted
-    retrieved_project = project_repository.get(project.project_id)
+    retrieved_project = await project_repository.get(project.project_id)
     assert retrieved_project is None 
\ No newline at end of file
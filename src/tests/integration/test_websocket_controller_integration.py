@@ -24,18 +24,24 @@ async def test_websocket_request_response():
         
         # Set up a timeout for receiving messages
         try:
-            while True:
-                # Wait for response with timeout
-                response = await asyncio.wait_for(websocket.recv(), timeout=30.0)
-                print(f"\nReceived response: {response}")
-                
-                # Parse the response
-                response_data = json.loads(response)
-                
-                # If we receive a completion message, break the loop
-                if response_data.get("type") == "completion":
-                    break
-                
+            completed = False
+            while not completed:
+                # Wait for response with timeout. The server coalesces
+                # events into binary frames of newline-delimited JSON.
+                frame = await asyncio.wait_for(websocket.recv(), timeout=30.0)
+                if isinstance(frame, bytes):
+                    frame = frame.decode()
+                print(f"\nReceived frame: {frame}")
+
+                for line in frame.split("\n"):
+                    if not line:
+                        continue
+                    response_data = json.loads(line)
+
+                    # If we receive a completion message, break the loop
+                    if response_data.get("type") == "completion":
+                        completed = True
+
         except asyncio.TimeoutError:
             print("\nTimeout waiting for response after 30 seconds")
             raise
@@ -12,7 +12,8 @@ async def test_start_agent_loop_unit():
     await agent.start_agent_loop(command={"type":"request","project_id":"123","content":"What is 2+2?"})
     assert len(event_history) > 1
     for event in event_history:
-        assert event["type"] in ["plan","findings","done"]
+        # "message" events are streamed text chunks; the rest are control events
+        assert event["type"] in ["message","plan","findings","done"]
         assert event["content_type"] in ["md","text"]
         assert len(event["content"]) > 0
     last = len(event_history)-1